@@ -1,24 +1,50 @@
 import os
+import json
 import asyncio
+import logging
+import functools
+import dataclasses
 from typing import Optional
+
+import jsonpatch
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
 from backend.state import AgentState
 from backend.models import ExerciseDraft, Critique, SupervisorDecision, AgentNote, DraftVersion, ReviewMetadata
-from backend.prompts import DRAFTER_PROMPT, SAFETY_PROMPT, CLINICAL_PROMPT, SUPERVISOR_PROMPT
-from backend.vector_store import search_drafts, initialize_vector_store, extract_topics
+from backend.prompts import DRAFTER_PROMPT, SAFETY_PROMPT, CLINICAL_PROMPT, SUPERVISOR_PROMPT, MEMORY_CLASSIFICATION_PROMPT, CHAT_PROMPT
+from backend.vector_store import search_drafts, search_drafts_stream, initialize_vector_store, TOPIC_PATTERN
+from backend.router import drafter_tier
+from backend import llm_cache
 from pydantic import BaseModel
 
-def get_llm():
+logger = logging.getLogger(__name__)
+
+# Shared empty default - nodes read scores off it or copy it with
+# dataclasses.replace, never mutate it in place
+_DEFAULT_METADATA = ReviewMetadata()
+
+@functools.lru_cache(maxsize=None)
+def get_llm(tier: str = "default"):
+    """
+    Shared ChatOpenAI clients so every node reuses a warm httpx connection pool.
+
+    The "fast" tier serves trivial structured-output tasks (intent
+    classification, deterministic routing fallbacks) on gpt-4o-mini; drafting
+    and reviewing stay on the default gpt-4o where quality matters.
+    """
+    if tier == "fast":
+        return ChatOpenAI(model="gpt-4o-mini", temperature=0)
     return ChatOpenAI(model="gpt-4o", temperature=0.2)
 
-class IntentClassification(BaseModel):
-    intent: str
-    reasoning: str
+@functools.lru_cache(maxsize=None)
+def get_structured_llm(schema, tier: str = "default"):
+    """Cache the with_structured_output wrapper per schema/tier to avoid rebuilding it each call."""
+    return get_llm(tier).with_structured_output(schema)
 
 class MemoryIntent(BaseModel):
     """Intent classification for memory agent"""
     intent: str  # "retrieve", "create_new", "modify_existing", "chat"
+    cbt_intent: str = "cbt_exercise"  # "chat" or "cbt_exercise" - replaces the old intent_router pass
     reasoning: str
     query: Optional[str] = None  # Extracted query for retrieval searches
 
@@ -30,38 +56,29 @@ async def memory_agent_node(state: AgentState):
     messages = state["messages"]
     last_message = messages[-1].content if messages else ""
     
-    # Intent classification prompt
-    classification_prompt = """You are a memory and retrieval agent. Analyze the user's message to determine their intent.
-
-Classify the intent as one of:
-1. "retrieve" - User wants to retrieve/view an existing draft they created earlier
-   Examples: "can I have the plan I made for anxiety", "show me my depression exercise", 
-   "what was that plan about stress", "give me the anxiety plan"
-   
-2. "create_new" - User wants to create a brand new draft/exercise
-   Examples: "make a plan for anxiety", "create an exercise for depression", 
-   "I need help with stress", "make another anxiety plan"
-   
-3. "modify_existing" - User wants to modify/edit an existing draft
-   Examples: "update my anxiety plan", "change the depression exercise", 
-   "edit the plan I made earlier"
-   
-4. "chat" - General conversation, greetings, questions about capabilities
-   Examples: "hello", "what can you do", "how are you"
-
-For "retrieve" intent, extract the key query terms (e.g., "anxiety", "depression", "stress plan").
-This will be used for semantic search.
-
-User message: "{message}"
-
-Think carefully about the user's intent."""
-    
-    llm = get_llm()
-    structured_llm = llm.with_structured_output(MemoryIntent)
-    
-    result = structured_llm.invoke([
-        SystemMessage(content=classification_prompt.format(message=last_message))
-    ])
+    # Classification is a tiny structured-output task - run it on the fast tier
+    structured_llm = get_structured_llm(MemoryIntent, tier="fast")
+
+    # Short messages ("hi", "show me my anxiety plan") recur constantly;
+    # check the response cache before paying for a classification round-trip
+    model_name = getattr(get_llm("fast"), "model_name", "gpt-4o-mini")
+    result = None
+    if llm_cache.cacheable(last_message):
+        result = llm_cache.lookup("memory_intent", model_name, last_message, semantic=True)
+
+    if result is None:
+        result = structured_llm.invoke([
+            SystemMessage(content=MEMORY_CLASSIFICATION_PROMPT),
+            HumanMessage(content=last_message)
+        ])
+        if llm_cache.cacheable(last_message):
+            # Keep retrieval-style classifications out of the semantic tier:
+            # their `query` field is message-specific, and a near-miss there
+            # ("panic plan" matching a cached "anxiety plan") would inherit
+            # the wrong query and retrieve the wrong draft. Exact-key reuse
+            # stays safe - same message, same query.
+            semantic_ok = result.intent not in ("retrieve", "modify_existing")
+            llm_cache.store("memory_intent", model_name, last_message, result, semantic=semantic_ok)
     
     memory_result = {
         "intent": result.intent,
@@ -78,12 +95,13 @@ Think carefully about the user's intent."""
         return {
             "memory_result": memory_result,
             "current_draft": None,
+            "current_draft_json": None,
             "draft_history": [],
             "critiques": [],
             "scratchpad": [],
             "metadata": ReviewMetadata(),  # Reset metadata
             "last_reviewer": None,
-            "next_worker": "intent_router"
+            "next_worker": "chat" if result.cbt_intent == "chat" else "supervisor"
         }
     
     # Only perform semantic search if intent is explicitly "retrieve"
@@ -93,85 +111,82 @@ Think carefully about the user's intent."""
             # Use the extracted query or fall back to full message
             search_query = result.query if result.query else last_message
             
-            # Extract topics from the full message as well (in case LLM didn't extract properly)
-            # This ensures we catch topics even if LLM extraction missed them
-            query_topics_from_message = extract_topics(last_message)
-            query_topics_from_query = extract_topics(search_query)
-            query_topics = query_topics_from_message.union(query_topics_from_query)
-            
-            # If no topics found, try extracting from the full message more aggressively
-            if not query_topics:
-                # Fallback: check if message contains common mental health terms
-                message_lower = last_message.lower()
-                if 'anxiety' in message_lower:
-                    query_topics.add('anxiety')
-                if 'depression' in message_lower:
-                    query_topics.add('depression')
-                if 'stress' in message_lower:
-                    query_topics.add('stress')
-            
-            matches = await search_drafts(search_query, limit=5, threshold=0.75)  # Get more matches for better filtering
-            
-            if matches:
-                # Find the best match that has topic overlap - STRICT validation
-                best_match = None
-                for match in matches:
-                    # Use original_message as primary source for topic validation
-                    # This ensures we match based on user's original request, not edited content
-                    draft_title = match.get('title', '')
-                    original_message = match.get('original_message', '')
-                    # Prioritize original_message - it's the source of truth for what topic was requested
-                    draft_text = f"{original_message} {draft_title}"
-                    draft_topics = extract_topics(draft_text)
-                    
-                    # STRICT: If query has topics, MUST have topic match
-                    if query_topics:
-                        topic_overlap = query_topics.intersection(draft_topics)
-                        if topic_overlap:
-                            # Topics match - this is a valid match
-                            print(f"Memory agent: Found match with topic overlap {topic_overlap}. Query topics: {query_topics}, Draft topics: {draft_topics}, Draft title: {draft_title}")
-                            best_match = match
-                            break
-                        else:
-                            # Topics don't match - skip this match
-                            print(f"Memory agent: Skipping match - topic mismatch. Query topics: {query_topics}, Draft topics: {draft_topics}, Draft title: {draft_title}")
+            # Extract topics from both the full message and the LLM-extracted
+            # query in one precompiled regex pass (catches topics the LLM missed)
+            query_topics = {m.lower() for m in TOPIC_PATTERN.findall(f"{last_message} {search_query}")}
+
+            # Stream candidates best-first and stop at the first validated
+            # match - the top hit is usually right, so the common path pays
+            # for one materialization and topic check. No cap on rejected
+            # candidates: the stream is already threshold-filtered, and
+            # skipping wrong-topic drafts must not exhaust the scan before
+            # the right one appears.
+            best_match = None
+            candidates_seen = 0
+            findall = TOPIC_PATTERN.findall  # bound once for the candidate loop
+            async for match in search_drafts_stream(search_query, threshold=0.75):
+                candidates_seen += 1
+                # Use original_message as primary source for topic validation
+                # This ensures we match based on user's original request, not edited content
+                draft_title = match.get('title', '')
+                original_message = match.get('original_message', '')
+                # Prioritize original_message - it's the source of truth for what topic was requested
+                draft_topics = {m.lower() for m in findall(f"{original_message} {draft_title}")}
+
+                # STRICT: If query has topics, MUST have topic match
+                if query_topics:
+                    topic_overlap = query_topics.intersection(draft_topics)
+                    if topic_overlap:
+                        # Topics match - this is a valid match
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Memory agent: match with topic overlap %s. Query topics: %s, Draft topics: %s, Draft title: %s",
+                                         topic_overlap, query_topics, draft_topics, draft_title)
+                        best_match = match
+                        break
                     else:
-                        # No topics in query - be very cautious
-                        # Only return if similarity is very high (>0.85) and we can't determine topic
-                        if match.get('similarity', 0) > 0.85:
-                            print(f"Memory agent: No topics in query, using high similarity match (>0.85)")
-                            best_match = match
-                            break
-                        # Otherwise skip - too risky to return wrong draft
-                
-                if best_match:
-                    # Topics match - proceed with returning the draft
-                    # Convert draft dict back to ExerciseDraft object
-                    from backend.models import ExerciseDraft
-                    draft_obj = ExerciseDraft(**best_match["draft"])
-                    
-                    memory_result.update({
-                        "found": True,
-                        "draft": best_match["draft"],  # Keep dict for JSON serialization
-                        "confidence": best_match["similarity"],
-                        "original_message": best_match["original_message"],
-                        "metadata": best_match.get("metadata", {})
-                    })
-                    
-                    # Also set current_draft so frontend can access it
-                    return {
-                        "memory_result": memory_result,
-                        "current_draft": draft_obj,
-                        "next_worker": "end",
-                        "metadata": ReviewMetadata(**best_match.get("metadata", {})) if best_match.get("metadata") else ReviewMetadata()
-                    }
+                        # Topics don't match - skip this match
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Memory agent: skipping match - topic mismatch. Query topics: %s, Draft topics: %s, Draft title: %s",
+                                         query_topics, draft_topics, draft_title)
                 else:
-                    # No match with topic overlap
-                    memory_result["found"] = False
-                    memory_result["reasoning"] += " (No draft found with matching topics)"
+                    # No topics in query - be very cautious
+                    # Only return if similarity is very high (>0.85) and we can't determine topic
+                    if match.get('similarity', 0) > 0.85:
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Memory agent: no topics in query, using high similarity match (>0.85)")
+                        best_match = match
+                        break
+                    # Otherwise skip - too risky to return wrong draft
+
+            if best_match:
+                # Topics match - proceed with returning the draft
+                # Convert draft dict back to ExerciseDraft object
+                from backend.models import ExerciseDraft
+                draft_obj = ExerciseDraft(**best_match["draft"])
+
+                memory_result.update({
+                    "found": True,
+                    "draft": best_match["draft"],  # Keep dict for JSON serialization
+                    "confidence": best_match["similarity"],
+                    "original_message": best_match["original_message"],
+                    "metadata": best_match.get("metadata", {})
+                })
+
+                # Also set current_draft so frontend can access it
+                return {
+                    "memory_result": memory_result,
+                    "current_draft": draft_obj,
+                    "current_draft_json": json.dumps(best_match["draft"]),
+                    "next_worker": "end",
+                    "metadata": ReviewMetadata(**best_match.get("metadata", {})) if best_match.get("metadata") else ReviewMetadata()
+                }
+            elif candidates_seen:
+                # No match with topic overlap
+                memory_result["found"] = False
+                memory_result["reasoning"] += " (No draft found with matching topics)"
         except Exception as e:
             # If search fails, log but continue
-            print(f"Error in semantic search: {e}")
+            logger.warning("Error in semantic search: %s", e)
             memory_result["reasoning"] += f" (Search error: {str(e)})"
     
     # If intent is "chat", route directly to chat
@@ -179,88 +194,68 @@ Think carefully about the user's intent."""
         return {
             "memory_result": memory_result,
             "next_worker": "chat",
-            "metadata": state.get("metadata", ReviewMetadata())
+            "metadata": state.get("metadata") or _DEFAULT_METADATA
         }
     
-    # For other intents, continue to intent_router (which will handle CBT exercise creation)
+    # For other intents, route directly on the fused classification
+    # (the separate intent_router LLM pass was folded into this node)
     return {
         "memory_result": memory_result,
-        "next_worker": "intent_router" if result.intent != "chat" else "chat",
-        "metadata": state.get("metadata", ReviewMetadata())
+        "next_worker": "chat" if result.cbt_intent == "chat" else "supervisor",
+        "metadata": state.get("metadata") or _DEFAULT_METADATA
     }
 
 
-def intent_router_node(state: AgentState):
-    messages = state["messages"]
-    last_message = messages[-1].content if messages else ""
-    
-    classification_prompt = """You are an intent classifier. Analyze the user's message carefully.
-
-Return "chat" if ONLY IF the user is:
-- Greeting (hi, hello, hey, what's up)
-- Asking about your capabilities (what can you do, how do you work)
-- Making small talk (how are you, thanks, bye)
-- Asking general questions NOT related to mental health
-
-Return "cbt_exercise" if the user mentions:
-- Mental health issues (anxiety, depression, stress, insomnia, OCD, etc.)
-- Wants help with emotions or thoughts
-- Requests a CBT exercise, therapy tool, or mental health support
-- Describes any psychological challenge or symptom
-
-Examples:
-"hey" → chat
-"hello" → chat
-"what can you do?" → chat
-"how are you?" → chat
-"I have insomnia" → cbt_exercise
-"I'm feeling anxious" → cbt_exercise
-"create a CBT exercise" → cbt_exercise
-"help with negative thoughts" → cbt_exercise
-
-User message: "{message}"
-
-Think carefully. What is the intent?"""
-
-    llm = get_llm()
-    structured_llm = llm.with_structured_output(IntentClassification)
-    
-    result = structured_llm.invoke([
-        SystemMessage(content=classification_prompt.format(message=last_message))
-    ])
-    
-    return {
-        "next_worker": result.intent,
-        "metadata": state.get("metadata", ReviewMetadata())
-    }
-
 def chat_response_node(state: AgentState):
     messages = state["messages"]
-    
-    chat_prompt = """You are Clarity CBT, a friendly AI assistant specializing in CBT exercises.
-
-For normal conversation, respond helpfully and let users know you can create personalized CBT exercises for mental health challenges like anxiety, depression, and procrastination.
+    llm = get_llm()
+    model_name = getattr(llm, "model_name", "gpt-4o")
+    last_message = messages[-1].content if messages else ""
 
-Keep responses concise and friendly."""
+    # Only cache single-turn small talk - longer threads carry context
+    use_cache = len(messages) <= 1 and llm_cache.cacheable(last_message)
+    response = llm_cache.lookup("chat", model_name, last_message) if use_cache else None
+    if response is not None:
+        # add_messages dedupes by message id, so handing back the cached
+        # object would *replace* its earlier occurrence in the thread instead
+        # of appending a new turn. Copy with id=None so the reducer assigns
+        # a fresh one.
+        response = response.model_copy(update={"id": None})
+
+    if response is None:
+        response = llm.invoke([SystemMessage(content=CHAT_PROMPT)] + messages)
+        if use_cache:
+            llm_cache.store("chat", model_name, last_message, response)
 
-    llm = get_llm()
-    response = llm.invoke([SystemMessage(content=chat_prompt)] + messages)
-    
     return {
         "messages": [response],
         "next_worker": "end",
-        "metadata": state.get("metadata", ReviewMetadata())
+        "metadata": state.get("metadata") or _DEFAULT_METADATA
     }
 
-def drafter_node(state: AgentState):
+async def drafter_node(state: AgentState):
     messages = [SystemMessage(content=DRAFTER_PROMPT)] + state["messages"]
     
+    # Single reverse walk instead of two full scans: only the 3 most recent
+    # notes per reviewer are ever used, so stop as soon as both buckets are
+    # full. Exact author comparison replaces the substring probe.
     scratchpad = state.get("scratchpad", [])
-    safety_notes = [n for n in scratchpad if "Safety" in n.author]
-    clinical_notes = [n for n in scratchpad if "Clinical" in n.author]
+    safety_notes = []
+    clinical_notes = []
+    for n in reversed(scratchpad):
+        if n.author == "Safety Guardian" and len(safety_notes) < 3:
+            safety_notes.append(n)
+        elif n.author == "Clinical Critic" and len(clinical_notes) < 3:
+            clinical_notes.append(n)
+        if len(safety_notes) >= 3 and len(clinical_notes) >= 3:
+            break
+    safety_notes.reverse()
+    clinical_notes.reverse()
     
     draft_history = state.get("draft_history", [])
-    version_num = len(draft_history) + 1
+    # Derive from the last entry's number, not the list length - the history
+    # channel is trimmed to HISTORY_LIMIT entries, so length understates it
+    version_num = (draft_history[-1].version_number + 1) if draft_history else 1
     
     revision_context = ""
     if state.get("critiques"):
@@ -281,9 +276,32 @@ def drafter_node(state: AgentState):
     if revision_context:
         messages.append(HumanMessage(content=f"Please revise the draft based on this feedback:{revision_context}"))
     
-    # Generate draft
-    structured_llm = get_llm().with_structured_output(ExerciseDraft)
-    response = structured_llm.invoke(messages)
+    # Tier the drafter by request complexity: one-topic one-liner requests
+    # draft fine on the fast model, only nuanced multi-condition requests
+    # pay for the premium tier
+    user_message = next(
+        (m.content for m in state["messages"] if isinstance(m, HumanMessage)), ""
+    )
+
+    # Generate draft. With a stream sink attached, stream partial objects so
+    # the caller can render the title/steps as they arrive; the reviewer chain
+    # still only sees the final draft. Without a sink, a plain async call
+    # avoids the partial-validation overhead of streaming.
+    structured_llm = get_structured_llm(ExerciseDraft, tier=drafter_tier(user_message))
+    sink = state.get("stream_sink")
+    if sink is None:
+        response = await structured_llm.ainvoke(messages)
+    else:
+        response = None
+        async for partial in structured_llm.astream(messages):
+            response = partial
+            try:
+                await sink(partial)
+            except Exception:
+                logger.warning("Draft stream sink failed; continuing without streaming")
+                sink = None
+        if not isinstance(response, ExerciseDraft):
+            response = ExerciseDraft(**response) if isinstance(response, dict) else response
     
     # Create version entry
     changes_made = "Initial draft" if not draft_history else f"Revised based on {len(state.get('critiques', []))} critiques"
@@ -302,17 +320,18 @@ def drafter_node(state: AgentState):
     )
     
     # Update metadata
-    metadata = state.get("metadata") or ReviewMetadata()
-    updated_metadata = ReviewMetadata(
-        safety_score=metadata.safety_score,
-        empathy_score=metadata.empathy_score,
-        clarity_score=metadata.clarity_score,
+    metadata = state.get("metadata") or _DEFAULT_METADATA
+    updated_metadata = dataclasses.replace(
+        metadata,
         iteration_count=metadata.iteration_count + 1,
         total_revisions=metadata.total_revisions + 1
     )
     
     return {
         "current_draft": response,
+        # Serialize once here; both reviewers read the cached JSON instead of
+        # re-walking the model tree per critique
+        "current_draft_json": response.model_dump_json(),
         "draft_history": [new_version],
         "scratchpad": [note],
         "metadata": updated_metadata,
@@ -320,20 +339,50 @@ def drafter_node(state: AgentState):
         "messages": [AIMessage(content=f"Drafted/Revised: {response.title} (v{version_num})")]
     }
 
-def safety_node(state: AgentState):
+
+def _draft_review_messages(state: AgentState):
+    """
+    Build the human messages a reviewer sees for the current draft.
+
+    The first review round gets the full draft JSON. Revision rounds get the
+    previous version's JSON (byte-identical to the prior round's prompt, so the
+    provider's prompt cache covers it) plus a compact RFC 6902 JSON Patch of
+    what changed, instead of re-sending the whole draft.
+    """
     current_draft = state.get("current_draft")
     draft_history = state.get("draft_history", [])
-    
-
     version_info = f"Reviewing draft v{len(draft_history)}" if draft_history else "Reviewing initial draft"
-    messages = [
-        SystemMessage(content=SAFETY_PROMPT),
-        HumanMessage(content=f"{version_info}\n\nDraft to review:\n{current_draft.model_dump_json()}")
+
+    if len(draft_history) >= 2:
+        previous = draft_history[-2].draft
+        patch = jsonpatch.make_patch(previous.model_dump(), current_draft.model_dump()).patch
+        return [
+            HumanMessage(content=f"Draft to review:\n{previous.model_dump_json()}"),
+            HumanMessage(content=(
+                f"{version_info}\n\n"
+                f"Changes since v{len(draft_history) - 1} (RFC 6902 JSON Patch):\n"
+                f"{json.dumps(patch)}\n"
+                "Apply the patch to the draft above and review the result."
+            ))
+        ]
+
+    draft_json = state.get("current_draft_json") or current_draft.model_dump_json()
+    return [
+        HumanMessage(content=f"Draft to review:\n{draft_json}"),
+        HumanMessage(content=version_info)
     ]
-    
 
-    structured_llm = get_llm().with_structured_output(Critique)
-    response = structured_llm.invoke(messages)
+async def safety_node(state: AgentState):
+    messages = [SystemMessage(content=SAFETY_PROMPT)] + _draft_review_messages(state)
+
+    # Tier safety review like the drafter: simple single-topic requests get
+    # the fast model, nuanced multi-condition content keeps the premium
+    # reviewer - exactly the cases where the checklist pass gets harder
+    user_message = next(
+        (m.content for m in state["messages"] if isinstance(m, HumanMessage)), ""
+    )
+    structured_llm = get_structured_llm(Critique, tier=drafter_tier(user_message))
+    response = await structured_llm.ainvoke(messages)
     response.author = "Safety Guardian"
     
 
@@ -351,14 +400,8 @@ def safety_node(state: AgentState):
     ]
     
 
-    metadata = state.get("metadata") or ReviewMetadata()
-    updated_metadata = ReviewMetadata(
-        safety_score=safety_score,
-        empathy_score=metadata.empathy_score,
-        clarity_score=metadata.clarity_score,
-        iteration_count=metadata.iteration_count,
-        total_revisions=metadata.total_revisions
-    )
+    metadata = state.get("metadata") or _DEFAULT_METADATA
+    updated_metadata = dataclasses.replace(metadata, safety_score=safety_score)
     
     return {
         "critiques": [response],
@@ -368,20 +411,12 @@ def safety_node(state: AgentState):
         "messages": [AIMessage(content=f"Safety Review: {'Approved' if response.approved else 'Rejected'} (Score: {safety_score})")]
     }
 
-def clinical_node(state: AgentState):
-    current_draft = state.get("current_draft")
-    draft_history = state.get("draft_history", [])
-    
-    # Build review context
-    version_info = f"Reviewing draft v{len(draft_history)}" if draft_history else "Reviewing initial draft"
-    messages = [
-        SystemMessage(content=CLINICAL_PROMPT),
-        HumanMessage(content=f"{version_info}\n\nDraft to review:\n{current_draft.model_dump_json()}")
-    ]
-    
+async def clinical_node(state: AgentState):
+    messages = [SystemMessage(content=CLINICAL_PROMPT)] + _draft_review_messages(state)
 
-    structured_llm = get_llm().with_structured_output(Critique)
-    response = structured_llm.invoke(messages)
+
+    structured_llm = get_structured_llm(Critique)
+    response = await structured_llm.ainvoke(messages)
     response.author = "Clinical Critic"
     
 
@@ -399,13 +434,11 @@ def clinical_node(state: AgentState):
     ]
     
 
-    metadata = state.get("metadata") or ReviewMetadata()
-    updated_metadata = ReviewMetadata(
-        safety_score=metadata.safety_score,
+    metadata = state.get("metadata") or _DEFAULT_METADATA
+    updated_metadata = dataclasses.replace(
+        metadata,
         empathy_score=empathy_score,
-        clarity_score=clarity_score,
-        iteration_count=metadata.iteration_count,
-        total_revisions=metadata.total_revisions
+        clarity_score=clarity_score
     )
     
     return {
@@ -416,9 +449,62 @@ def clinical_node(state: AgentState):
         "messages": [AIMessage(content=f"Clinical Review: {'Approved' if response.approved else 'Rejected'} (Empathy: {empathy_score}, Clarity: {clarity_score})")]
     }
 
+def supervisor_rules(state: AgentState) -> Optional[str]:
+    """
+    Deterministic routing rules mirroring SUPERVISOR_PROMPT.
+
+    Most supervisor decisions follow mechanically from state: no draft means
+    draft, a fresh draft means review, both reviewers approved means done,
+    any rejection means revise. Returns None only for states the rules don't
+    cover, which fall through to the LLM.
+
+    The rules only apply mid-workflow. A trailing HumanMessage means a new
+    user request arrived after the last workflow step (e.g. "update my
+    anxiety plan" on a thread whose review already completed); replaying the
+    completed-state rules there would end the turn without any agent seeing
+    the request, so those states go to the LLM supervisor instead.
+    """
+    if not state.get("current_draft"):
+        return "drafter"
+
+    messages = state.get("messages") or []
+    if messages and isinstance(messages[-1], HumanMessage):
+        return None
+
+    metadata = state.get("metadata")
+    if metadata and metadata.total_revisions > 5:
+        return "human_review"  # safety valve against endless review loops
+
+    last_reviewer = state.get("last_reviewer")
+    if last_reviewer in (None, "drafter"):
+        return "review"
+
+    if last_reviewer == "review":
+        critiques = state.get("critiques", [])
+        latest = critiques[-2:]
+        if len(latest) == 2 and {c.author for c in latest} == {"Safety Guardian", "Clinical Critic"}:
+            if all(c.approved for c in latest):
+                return "human_review"
+            return "drafter"
+
+    return None
+
 def supervisor_node(state: AgentState):
-    messages = [SystemMessage(content=SUPERVISOR_PROMPT)] + state["messages"]
-    
+    # Cheap rule-based fast path first - skipping the LLM here removes the
+    # most expensive call from every loop iteration
+    decision = supervisor_rules(state)
+    if decision:
+        return {"next_worker": decision}
+
+    # The dialogue grows with every node's status echo ("Safety Review: ...",
+    # "Drafted/Revised: ..."), so replaying the full history just feeds the
+    # supervisor its own output. Keep the original user request plus the last
+    # few events - the Current State block below carries everything else.
+    history = state["messages"]
+    if len(history) > 5:
+        history = history[:1] + history[-4:]
+    messages = [SystemMessage(content=SUPERVISOR_PROMPT)] + history
+
 
     current_draft = state.get("current_draft")
     draft_history = state.get("draft_history", [])
@@ -451,7 +537,8 @@ Recent Scratchpad Notes:
     
     messages.append(HumanMessage(content=context))
     
-    structured_llm = get_llm().with_structured_output(SupervisorDecision)
+    # Routing fallback is simple enough for the fast tier
+    structured_llm = get_structured_llm(SupervisorDecision, tier="fast")
     response = structured_llm.invoke(messages)
     
     return {"next_worker": response.next_node}
@@ -1,59 +1,100 @@
+import asyncio
+import dataclasses
+import os
+import aiosqlite
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from backend.checkpointing import DeferredSqliteSaver
 from backend.state import AgentState
-from backend.agents import drafter_node, safety_node, clinical_node, supervisor_node, intent_router_node, chat_response_node, memory_agent_node
+from backend.agents import drafter_node, safety_node, clinical_node, supervisor_node, chat_response_node, memory_agent_node, supervisor_rules
+
+
+async def review_node(state: AgentState):
+    """
+    Run the Safety Guardian and Clinical Critic concurrently.
+    Both reviewers only read current_draft, so their critiques are independent
+    and the review round-trip costs max(safety, clinical) instead of the sum.
+    """
+    safety_result, clinical_result = await asyncio.gather(
+        safety_node(state),
+        clinical_node(state)
+    )
+
+    # Merge metadata: safety score from the Safety Guardian,
+    # empathy/clarity from the Clinical Critic
+    safety_meta = safety_result["metadata"]
+    clinical_meta = clinical_result["metadata"]
+    merged_metadata = dataclasses.replace(
+        safety_meta,
+        empathy_score=clinical_meta.empathy_score,
+        clarity_score=clinical_meta.clarity_score
+    )
+
+    return {
+        "critiques": safety_result["critiques"] + clinical_result["critiques"],
+        "scratchpad": safety_result["scratchpad"] + clinical_result["scratchpad"],
+        "messages": safety_result["messages"] + clinical_result["messages"],
+        "metadata": merged_metadata,
+        "last_reviewer": "review"
+    }
 
 
 workflow = StateGraph(AgentState)
 
 
 workflow.add_node("memory_agent", memory_agent_node)
-workflow.add_node("intent_router", intent_router_node)
 workflow.add_node("chat", chat_response_node)
 workflow.add_node("supervisor", supervisor_node)
 workflow.add_node("drafter", drafter_node)
-workflow.add_node("safety_guardian", safety_node)
-workflow.add_node("clinical_critic", clinical_node)
+workflow.add_node("review", review_node)
 
 def route_supervisor(state: AgentState):
     next_node = state["next_worker"]
     if next_node == "end":
         return END
+    # Legacy routing targets from before the reviewers were fused
+    if next_node in ("safety_guardian", "clinical_critic"):
+        return "review"
     return next_node
 
 
-workflow.add_edge("drafter", "supervisor")
-workflow.add_edge("safety_guardian", "supervisor")
-workflow.add_edge("clinical_critic", "supervisor")
+def route_after_step(state: AgentState):
+    """
+    Route drafter/review output directly with the deterministic supervisor
+    rules. When the rules decide, the supervisor node (and its checkpoint)
+    is skipped entirely; only genuinely ambiguous states fall through to the
+    LLM-backed supervisor.
+    """
+    decision = supervisor_rules(state)
+    if decision is None:
+        return "supervisor"
+    if decision == "human_review":
+        return END
+    return decision
+
+
+_AFTER_STEP_TARGETS = {
+    "drafter": "drafter",
+    "review": "review",
+    "supervisor": "supervisor",
+    END: END
+}
+
+workflow.add_conditional_edges("drafter", route_after_step, _AFTER_STEP_TARGETS)
+workflow.add_conditional_edges("review", route_after_step, _AFTER_STEP_TARGETS)
 
 workflow.add_conditional_edges(
     "supervisor",
     route_supervisor,
     {
         "drafter": "drafter",
-        "safety_guardian": "safety_guardian",
-        "clinical_critic": "clinical_critic",
-        "human_review": END, 
+        "review": "review",
+        "human_review": END,
         "end": END
     }
 )
 
 
-def route_intent(state: AgentState):
-    next_node = state["next_worker"]
-    if next_node == "chat":
-        return "chat"
-    return "supervisor"
-
-workflow.add_conditional_edges(
-    "intent_router",
-    route_intent,
-    {
-        "chat": "chat",
-        "supervisor": "supervisor"
-    }
-)
-
 workflow.add_edge("chat", END)
 
 def route_memory(state: AgentState):
@@ -64,17 +105,18 @@ def route_memory(state: AgentState):
     if memory_result and memory_result.get("intent") == "retrieve" and memory_result.get("found"):
         return END
     
-    # Otherwise, continue to intent_router for normal workflow
-    next_worker = state.get("next_worker", "intent_router")
+    # Otherwise, continue to the supervisor for the normal workflow
+    # (intent classification is fused into the memory agent)
+    next_worker = state.get("next_worker", "supervisor")
     if next_worker == "chat":
         return "chat"
-    return "intent_router"
+    return "supervisor"
 
 workflow.add_conditional_edges(
     "memory_agent",
     route_memory,
     {
-        "intent_router": "intent_router",
+        "supervisor": "supervisor",
         "chat": "chat",
         END: END
     }
@@ -85,3 +127,36 @@ workflow.set_entry_point("memory_agent")
 
 def get_graph():
     return workflow
+
+
+_checkpointer = None
+
+async def get_checkpointer(db_path: str = "backend/checkpoints.db", checkpoint_mode: str = None):
+    """
+    Shared AsyncSqliteSaver over a single tuned connection.
+
+    The graph checkpoints after every node transition (6+ per user turn), and
+    stock SQLite pays a full fsync for each. WAL with synchronous=NORMAL
+    batches those syncs, and reusing one connection keeps the page cache warm
+    across requests instead of re-opening the database per workflow.
+
+    checkpoint_mode (default per_step, or the CHECKPOINT_MODE env var):
+    - "per_step": persist after every super-step, full crash recovery
+    - "end_of_workflow": buffer steps in RAM and write SQLite once per turn
+      via DeferredSqliteSaver; callers flush with checkpointer.aflush()
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        conn = await aiosqlite.connect(db_path, check_same_thread=False)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        await conn.execute("PRAGMA temp_store=MEMORY")
+        await conn.execute("PRAGMA cache_size=-65536")  # 64MB page cache
+        await conn.execute("PRAGMA mmap_size=268435456")
+        saver = AsyncSqliteSaver(conn)
+        if checkpoint_mode is None:
+            checkpoint_mode = os.getenv("CHECKPOINT_MODE", "per_step")
+        if checkpoint_mode == "end_of_workflow":
+            saver = DeferredSqliteSaver(saver)
+        _checkpointer = saver
+    return _checkpointer
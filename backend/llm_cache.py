@@ -0,0 +1,88 @@
+"""
+Two-tier response cache for small, near-deterministic LLM calls.
+
+Tier 1 (exact): LRU dict keyed on sha256(namespace + model + normalized message).
+Tier 2 (semantic): cosine similarity against embeddings of previously cached
+messages, reusing the embedding pipeline from backend.vector_store.
+
+Intended for the intent-classification and small-talk paths, where the same
+short inputs ("hi", "what can you do") recur constantly and a cached structured
+output is indistinguishable from a fresh one. Only wrap low-temperature calls
+with short inputs - long or creative requests should always hit the model.
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Any, List, Optional, Tuple
+
+from backend.vector_store import generate_embedding, cosine_similarity
+
+# Messages longer than this are assumed to be real requests, not small talk
+MAX_CACHEABLE_LENGTH = 128
+SEMANTIC_THRESHOLD = 0.95
+
+_EXACT_MAXSIZE = 4096
+_SEMANTIC_MAXSIZE = 512
+
+_exact_cache: "OrderedDict[str, Any]" = OrderedDict()
+# Each entry: (namespace, embedding, cached value)
+_semantic_cache: List[Tuple[str, List[float], Any]] = []
+
+
+def _normalize(message: str) -> str:
+    """Normalize a message for cache-key purposes (lowercase, collapse whitespace)."""
+    return " ".join(message.lower().strip().split())
+
+
+def _key(namespace: str, model: str, message: str) -> str:
+    raw = f"{namespace}:{model}:{_normalize(message)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cacheable(message: str) -> bool:
+    """Whether a message is a candidate for response caching."""
+    return bool(message) and len(message) <= MAX_CACHEABLE_LENGTH
+
+
+def lookup(namespace: str, model: str, message: str, semantic: bool = False) -> Optional[Any]:
+    """
+    Return a cached response for this message, or None on a miss.
+    With semantic=True, fall back to embedding similarity when the exact
+    key misses (costs one embedding call, still far cheaper than the LLM).
+    """
+    key = _key(namespace, model, message)
+    if key in _exact_cache:
+        _exact_cache.move_to_end(key)
+        return _exact_cache[key]
+
+    if semantic and _semantic_cache:
+        try:
+            query_embedding = generate_embedding(_normalize(message))
+        except Exception:
+            return None
+        for ns, embedding, value in _semantic_cache:
+            if ns == namespace and cosine_similarity(query_embedding, embedding) >= SEMANTIC_THRESHOLD:
+                # Promote to the exact tier so the next identical message is free
+                _store_exact(key, value)
+                return value
+    return None
+
+
+def store(namespace: str, model: str, message: str, value: Any, semantic: bool = False) -> None:
+    """Cache a response; with semantic=True also index it by embedding."""
+    _store_exact(_key(namespace, model, message), value)
+
+    if semantic:
+        try:
+            embedding = generate_embedding(_normalize(message))
+        except Exception:
+            return
+        _semantic_cache.append((namespace, embedding, value))
+        if len(_semantic_cache) > _SEMANTIC_MAXSIZE:
+            del _semantic_cache[0]
+
+
+def _store_exact(key: str, value: Any) -> None:
+    _exact_cache[key] = value
+    _exact_cache.move_to_end(key)
+    if len(_exact_cache) > _EXACT_MAXSIZE:
+        _exact_cache.popitem(last=False)
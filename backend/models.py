@@ -1,7 +1,14 @@
+from dataclasses import dataclass, field
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
+# LLM-facing schemas stay Pydantic - with_structured_output needs them.
+# Internal bookkeeping types (AgentNote, DraftVersion, ReviewMetadata) are
+# slotted dataclasses: they are built on nearly every node call and don't
+# need per-instance validation, so skipping Pydantic construction saves
+# allocation and validation cost on the hot path.
+
 class ExerciseDraft(BaseModel):
     title: str = Field(description="Title of the CBT exercise")
     content: str = Field(description="The full markdown content of the exercise")
@@ -16,26 +23,29 @@ class SupervisorDecision(BaseModel):
     next_node: str = Field(description="The next worker node to call")
     reasoning: str = Field(description="Reasoning for the routing decision")
 
-class AgentNote(BaseModel):
+@dataclass(slots=True)
+class AgentNote:
     """Scratchpad note from one agent to others"""
-    author: str = Field(description="Agent who wrote this note")
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
-    target: Optional[str] = Field(default=None, description="Which agent this is for")
-    content: str = Field(description="The note content")
-    priority: str = Field(default="info", description="Priority level: info, warning, critical")
+    author: str  # Agent who wrote this note
+    content: str  # The note content
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+    target: Optional[str] = None  # Which agent this is for
+    priority: str = "info"  # Priority level: info, warning, critical
 
-class DraftVersion(BaseModel):
+@dataclass(slots=True)
+class DraftVersion:
     """A version of the exercise draft"""
-    version_number: int = Field(description="Version number")
-    timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
-    draft: ExerciseDraft = Field(description="The draft content")
-    created_by: str = Field(description="Agent who created this version")
-    notes: str = Field(description="Notes about this version")
+    version_number: int  # Version number
+    draft: ExerciseDraft  # The draft content
+    created_by: str  # Agent who created this version
+    notes: str  # Notes about this version
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
 
-class ReviewMetadata(BaseModel):
+@dataclass(slots=True)
+class ReviewMetadata:
     """Metrics and scores for the review process"""
-    safety_score: Optional[float] = Field(default=None, description="Safety score 0-1")
-    empathy_score: Optional[float] = Field(default=None, description="Empathy score 0-1")
-    clarity_score: Optional[float] = Field(default=None, description="Clarity score 0-1")
-    iteration_count: int = Field(default=0, description="Number of iterations")
-    total_revisions: int = Field(default=0, description="Total revision count")
+    safety_score: Optional[float] = None  # Safety score 0-1
+    empathy_score: Optional[float] = None  # Empathy score 0-1
+    clarity_score: Optional[float] = None  # Clarity score 0-1
+    iteration_count: int = 0  # Number of iterations
+    total_revisions: int = 0  # Total revision count
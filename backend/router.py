@@ -0,0 +1,42 @@
+"""
+Request-complexity routing for model tiering.
+Simple requests can run on the fast/cheap tier; nuanced multi-condition
+requests escalate to the premium model.
+"""
+import re
+from backend.vector_store import TOPIC_PATTERN
+
+SIMPLE = "simple"
+COMPLEX = "complex"
+
+# Coordination words signalling a request that combines conditions or
+# constraints ("anxiety and insomnia, but tailored for shift work")
+_CONJUNCTION_RE = re.compile(
+    r'\b(and|also|plus|while|but|except|as well as|combined with|along with)\b',
+    re.IGNORECASE
+)
+
+
+def classify_complexity(message: str) -> str:
+    """
+    Classify a user request as "simple" or "complex".
+
+    Deterministic and local (<1ms): long messages, messages touching multiple
+    mental-health topics, or messages stacking several coordination clauses
+    are complex; everything else ("CBT for stress") is simple.
+    """
+    if not message:
+        return SIMPLE
+    if len(message) > 280:
+        return COMPLEX
+    topics = {m.lower() for m in TOPIC_PATTERN.findall(message)}
+    if len(topics) >= 2:
+        return COMPLEX
+    if len(_CONJUNCTION_RE.findall(message)) >= 2:
+        return COMPLEX
+    return SIMPLE
+
+
+def drafter_tier(message: str) -> str:
+    """Map request complexity to the LLM tier the drafter should use."""
+    return "fast" if classify_complexity(message) == SIMPLE else "default"
@@ -1,40 +1,63 @@
 import uvicorn
-import json
+import asyncio
 import os
+import re
+import logging
+import dataclasses
 import aiosqlite
-from fastapi import FastAPI, HTTPException
+import orjson
+from fastapi import BackgroundTasks, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
-from backend.graph import get_graph
+from backend.graph import get_graph, get_checkpointer
 from backend.models import ReviewMetadata
+from backend.state import HISTORY_LIMIT
 from backend.vector_store import initialize_vector_store, index_draft
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import BaseMessage, HumanMessage
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-load_dotenv()
+# .env parsing is a dev convenience; production deployments inject real
+# env vars, so skip the stat/parse of the file there
+if os.getenv("ENV") != "production":
+    load_dotenv()
+
+# Keep stdout quiet in production; node-level tracing uses logger.debug and
+# only fires when LOG_LEVEL=DEBUG is set explicitly
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"))
+
+# Compiled once at import; normalize_message sits on the /save-draft path
+_WS_RE = re.compile(r'\s+')
+_PUNCT_RE = re.compile(r'[^\w\s]')
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    async with AsyncSqliteSaver.from_conn_string("backend/checkpoints.db") as checkpointer:
-        app.state.graph = get_graph().compile(checkpointer=checkpointer)
-        # Initialize vector store
-        await initialize_vector_store()
-        yield
+    checkpointer = await get_checkpointer()
+    app.state.checkpointer = checkpointer
+    app.state.graph = get_graph().compile(checkpointer=checkpointer)
+    # Initialize vector store
+    await initialize_vector_store()
+    yield
+
 
+# orjson serializes responses in C and skips jsonable_encoder for
+# pre-serialized payloads - the dominant CPU cost on the state endpoint
+app = FastAPI(title="Clarity CBT API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
-app = FastAPI(title="Clarity CBT API", lifespan=lifespan)
+# A concrete origin list plus max_age lets browsers cache preflight
+# responses instead of paying an OPTIONS round-trip before every /stream
+FRONTEND_ORIGIN = os.getenv("FRONTEND_ORIGIN", "http://localhost:5173")
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=[FRONTEND_ORIGIN],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type"],
+    max_age=600,
 )
 
 class RequestData(BaseModel):
@@ -51,16 +74,122 @@ class SaveDraftData(BaseModel):
     original_message: Optional[str] = None  # Original user message for retrieval
 
 
+def _make_serializers():
+    """Build a (dumps, msg_to_dict) pair with caches scoped to one request.
+
+    Both caches key on id(obj) but store (obj, dumped) tuples: the strong
+    reference pins each cached object so CPython can't hand its address to a
+    new allocation, and the `is` check on lookup rejects any stale entry.
+    That matters even within one stream - bounded_add trims critiques and
+    scratchpad notes mid-workflow, so state objects can be freed between
+    events. Scoping the caches to a single request/stream keeps them small
+    and ensures one thread's state is never served to another, while the
+    same draft/critique objects still recur across a stream's events, so
+    the reuse the caches exist for still happens.
+    """
+    dump_cache = {}
+    msg_cache = {}
+
+    def msg_to_dict(msg):
+        """Serialize a LangChain message once per object, coercing content to str."""
+        key = id(msg)
+        cached = msg_cache.get(key)
+        if cached is not None and cached[0] is msg:
+            return cached[1]
+        try:
+            if hasattr(msg, 'model_dump'):
+                msg_dict = msg.model_dump()
+            elif hasattr(msg, 'dict'):
+                msg_dict = msg.dict()
+            else:
+                # Fallback: extract content and type
+                msg_dict = {
+                    "type": getattr(msg, 'type', 'unknown'),
+                    "content": getattr(msg, 'content', str(msg))
+                }
+            # Ensure content is a string
+            content = msg_dict.get('content')
+            if isinstance(content, list):
+                msg_dict['content'] = ' '.join(str(c) for c in content)
+            elif not isinstance(content, str):
+                msg_dict['content'] = str(content) if content is not None else ''
+        except Exception:
+            msg_dict = {
+                "type": "unknown",
+                "content": str(msg) if hasattr(msg, '__str__') else "Unable to serialize message"
+            }
+        msg_cache[key] = (msg, msg_dict)
+        return msg_dict
+
+    def default(o):
+        """orjson fallback for the state objects it can't serialize natively.
+
+        orjson walks lists/dicts/scalars (and datetimes) in C and only calls
+        back into Python for unknown types, so this replaces the old recursive
+        serialize_state_value/serialize_message pair. Dataclasses return a
+        shallow field dict; orjson recurses into nested Pydantic models
+        (DraftVersion.draft) through this same hook.
+        """
+        if isinstance(o, BaseMessage):
+            return msg_to_dict(o)
+        if hasattr(o, 'model_dump'):
+            key = id(o)
+            cached = dump_cache.get(key)
+            if cached is not None and cached[0] is o:
+                return cached[1]
+            dumped = o.model_dump()
+            dump_cache[key] = (o, dumped)
+            return dumped
+        if dataclasses.is_dataclass(o) and not isinstance(o, type):
+            return {f.name: getattr(o, f.name) for f in dataclasses.fields(o)}
+        if hasattr(o, 'dict'):
+            return o.dict()
+        return str(o)
+
+    def dumps(value):
+        """Serialize a state value to JSON bytes via orjson."""
+        return orjson.dumps(value, default=default, option=orjson.OPT_NON_STR_KEYS)
+
+    return dumps, msg_to_dict
+
+
+# SSE framing precomputed once; yielding bytes skips the per-event
+# str.format + encode round trip inside StreamingResponse
+_SSE_PREFIX = b"data: "
+_SSE_SUFFIX = b"\n\n"
+
+# Frames arriving within this window coalesce into one socket write; a
+# workflow turn can emit hundreds of sub-1KB events and each yield costs a
+# full uvicorn send + syscall. 20ms is imperceptible next to LLM latency.
+_SSE_FLUSH_BYTES = 16384
+_SSE_FLUSH_SECS = 0.02
+
+
+async def _flush_checkpoints(thread_id: str):
+    """Persist buffered checkpoints when running in end_of_workflow mode."""
+    checkpointer = getattr(app.state, "checkpointer", None)
+    if checkpointer is not None and hasattr(checkpointer, "aflush"):
+        await checkpointer.aflush(thread_id)
+
+
+async def _index_draft_safely(draft, original_message, metadata):
+    """Index a draft, logging failures instead of raising (background task)."""
+    try:
+        await index_draft(draft, original_message, metadata)
+    except Exception as e:
+        # Log error but don't fail anything - indexing is best-effort
+        print(f"Error auto-indexing draft: {e}")
+
 
 @app.post("/stream")
 async def stream_workflow(data: RequestData):
     """Stream the workflow execution with real-time updates"""
     graph = app.state.graph
     config = {"configurable": {"thread_id": data.thread_id}}
-    
+
     # Check if this is a new conversation
     current_state = await graph.aget_state(config)
-    
+
     # Memory agent will handle intent classification and retrieval
     # Just pass the message to the workflow
     if not current_state.values:
@@ -68,6 +197,7 @@ async def stream_workflow(data: RequestData):
         inputs = {
             "messages": [HumanMessage(content=data.message)],
             "current_draft": None,
+            "current_draft_json": None,
             "draft_history": [],
             "critiques": [],
             "scratchpad": [],
@@ -78,66 +208,78 @@ async def stream_workflow(data: RequestData):
     else:
         # Continue with existing state - memory agent will handle routing
         inputs = {"messages": [HumanMessage(content=data.message)]}
-    
-    def serialize_message(msg):
-        """Serialize a LangChain message to a dict"""
-        try:
-            if hasattr(msg, 'model_dump'):
-                return msg.model_dump()
-            elif hasattr(msg, 'dict'):
-                return msg.dict()
-            else:
-                return {
-                    "type": getattr(msg, 'type', 'unknown'),
-                    "content": getattr(msg, 'content', str(msg))
-                }
-        except Exception:
-            return {"type": "unknown", "content": str(msg)}
-    
-    def serialize_state_value(value):
-        """Recursively serialize state values"""
-        if isinstance(value, list):
-            return [serialize_state_value(item) for item in value]
-        elif hasattr(value, 'model_dump'):
-            return value.model_dump()
-        elif hasattr(value, 'dict'):
-            return value.dict()
-        elif isinstance(value, dict):
-            return {k: serialize_state_value(v) for k, v in value.items()}
-        else:
-            return value
-    
+
     async def generate():
-        """Generator for streaming events"""
+        """Generator for streaming events, coalescing bursts into one write.
+
+        A producer task feeds framed events into a queue; the consumer drains
+        whatever accumulates within _SSE_FLUSH_SECS (or up to
+        _SSE_FLUSH_BYTES) into a single yield. The timeout only ever cancels
+        the queue.get, never the graph execution itself.
+        """
+        done_sentinel = object()
+        queue: asyncio.Queue = asyncio.Queue()
+        # Per-stream caches: state objects recur across this stream's events
+        # but stay alive (referenced by the graph state) for its duration
+        dumps, _ = _make_serializers()
+
+        async def produce():
+            try:
+                async for event in graph.astream(inputs, config=config):
+                    # orjson walks the raw event in C; the default hook
+                    # handles the Pydantic/dataclass leaves (messages included)
+                    queue.put_nowait(_SSE_PREFIX + dumps(event) + _SSE_SUFFIX)
+
+                # Workflow turn done - in end_of_workflow mode this is the
+                # single SQLite write for everything buffered above
+                await _flush_checkpoints(data.thread_id)
+
+                # Send completion signal
+                queue.put_nowait(_SSE_PREFIX + orjson.dumps({'type': 'complete'}) + _SSE_SUFFIX)
+            except Exception as e:
+                queue.put_nowait(_SSE_PREFIX + orjson.dumps({'type': 'error', 'error': str(e)}) + _SSE_SUFFIX)
+            finally:
+                queue.put_nowait(done_sentinel)
+
+        producer = asyncio.create_task(produce())
+        loop = asyncio.get_running_loop()
+        buf = bytearray()
         try:
-            async for event in graph.astream(inputs, config=config):
-                # Serialize the event properly
-                serialized_event = {}
-                for node_name, node_data in event.items():
-                    if isinstance(node_data, dict):
-                        serialized_event[node_name] = {}
-                        for key, value in node_data.items():
-                            if key == 'messages' and isinstance(value, list):
-                                # Special handling for messages
-                                serialized_event[node_name][key] = [serialize_message(msg) for msg in value]
-                            else:
-                                serialized_event[node_name][key] = serialize_state_value(value)
-                    else:
-                        serialized_event[node_name] = serialize_state_value(node_data)
-                
-                # Send each event as JSON
-                yield f"data: {json.dumps(serialized_event)}\n\n"
-            
-            # Send completion signal
-            yield f"data: {json.dumps({'type': 'complete'})}\n\n"
-        except Exception as e:
-            yield f"data: {json.dumps({'type': 'error', 'error': str(e)})}\n\n"
-    
-    return StreamingResponse(generate(), media_type="text/event-stream")
+            finished = False
+            while not finished:
+                frame = await queue.get()
+                if frame is done_sentinel:
+                    break
+                buf += frame
+                deadline = loop.time() + _SSE_FLUSH_SECS
+                while len(buf) < _SSE_FLUSH_BYTES:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        frame = await asyncio.wait_for(queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                    if frame is done_sentinel:
+                        finished = True
+                        break
+                    buf += frame
+                yield bytes(buf)
+                buf.clear()
+        finally:
+            # A client disconnect still stops the workflow, as before
+            producer.cancel()
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        # Tell nginx-style proxies not to re-buffer what we just coalesced
+        headers={"X-Accel-Buffering": "no"}
+    )
 
 
 @app.get("/state/{thread_id}")
-async def get_state(thread_id: str):
+async def get_state(thread_id: str, background_tasks: BackgroundTasks):
     """Get current state for a thread"""
     graph = app.state.graph
     config = {"configurable": {"thread_id": thread_id}}
@@ -148,23 +290,12 @@ async def get_state(thread_id: str):
     
     # Convert messages to JSON-serializable format and extract original user message
     messages = state.values.get("messages", [])
-    serialized_messages = []
-    original_user_message = None
-    
-    # Better extraction of original user message
-    for msg in messages:
-        # Check if it's a HumanMessage object
-        if hasattr(msg, 'type') and msg.type == 'human':
-            original_user_message = msg.content if hasattr(msg, 'content') else str(msg)
-        # Check if it's a HumanMessage by class name
-        elif hasattr(msg, '__class__') and 'HumanMessage' in str(type(msg)):
-            original_user_message = msg.content if hasattr(msg, 'content') else str(msg)
-        # Check if it's already a dict
-        elif isinstance(msg, dict) and msg.get('type') in ['human', 'HumanMessage', 'user']:
-            original_user_message = msg.get('content', '')
-        
-        if original_user_message:
-            break  # Found the first user message
+
+    # Checkpointed messages are always rehydrated LangChain objects, so a
+    # single isinstance check replaces the old string/getattr probing
+    original_user_message = next(
+        (msg.content for msg in messages if isinstance(msg, HumanMessage)), None
+    )
     
     # Auto-index completed drafts
     current_draft = state.values.get("current_draft")
@@ -173,55 +304,47 @@ async def get_state(thread_id: str):
         last_reviewer = state.values.get("last_reviewer")
         next_worker = state.values.get("next_worker")
         
-        # Save if draft has been reviewed (either approved or reached human review)
-        if last_reviewer in ['safety_guardian', 'clinical_critic'] or next_worker == 'human_review':
-            try:
-                metadata = state.values.get("metadata")
-                await index_draft(current_draft, original_user_message, metadata)
-            except Exception as e:
-                # Log error but don't fail the request
-                print(f"Error auto-indexing draft: {e}")
+        # Save if draft has been reviewed (either approved or reached human review).
+        # Indexing embeds via OpenAI and writes sqlite - run it after the
+        # response is sent instead of making the client wait for it.
+        if last_reviewer in ['review', 'safety_guardian', 'clinical_critic'] or next_worker == 'human_review':
+            metadata = state.values.get("metadata")
+            background_tasks.add_task(_index_draft_safely, current_draft, original_user_message, metadata)
     
-    # Continue serializing messages
-    for msg in messages:
-        try:
-            if hasattr(msg, 'model_dump'):
-                msg_dict = msg.model_dump()
-            elif hasattr(msg, 'dict'):
-                msg_dict = msg.dict()
-            else:
-                # Fallback: extract content and type
-                msg_dict = {
-                    "type": getattr(msg, 'type', 'unknown'),
-                    "content": getattr(msg, 'content', str(msg))
-                }
-            # Ensure content is a string
-            if isinstance(msg_dict.get('content'), list):
-                # Handle case where content might be a list
-                msg_dict['content'] = ' '.join(str(c) for c in msg_dict['content'])
-            elif not isinstance(msg_dict.get('content'), str):
-                msg_dict['content'] = str(msg_dict.get('content', ''))
-            
-            serialized_messages.append(msg_dict)
-        except Exception as e:
-            # If serialization fails, create a simple dict
-            serialized_messages.append({
-                "type": "unknown",
-                "content": str(msg) if hasattr(msg, '__str__') else "Unable to serialize message"
-            })
-    
-    # Convert state to JSON-serializable format
-    return {
-        "current_draft": state.values.get("current_draft"),
-        "draft_history": state.values.get("draft_history", []),
-        "critiques": state.values.get("critiques", []),
-        "scratchpad": state.values.get("scratchpad", []),
-        "metadata": state.values.get("metadata"),
-        "last_reviewer": state.values.get("last_reviewer"),
-        "next_worker": state.values.get("next_worker"),
-        "memory_result": state.values.get("memory_result"),
-        "messages": serialized_messages
-    }
+    # Stream the response one section (and one message) at a time instead of
+    # materializing the whole serialized state: first bytes go out immediately
+    # and peak memory is one message, not the full thread history
+    async def generate_state():
+        values = state.values
+        # Per-request caches: the rehydrated state objects live exactly as
+        # long as this response, so identity keying can't leak across threads
+        state_dumps, msg_to_dict = _make_serializers()
+        yield b'{"current_draft":' + state_dumps(values.get("current_draft"))
+        yield b',"draft_history":' + state_dumps(values.get("draft_history", []))
+        yield b',"critiques":' + state_dumps(values.get("critiques", []))
+        yield b',"scratchpad":' + state_dumps(values.get("scratchpad", []))
+        yield b',"metadata":' + state_dumps(values.get("metadata"))
+        yield b',"last_reviewer":' + orjson.dumps(values.get("last_reviewer"))
+        yield b',"next_worker":' + orjson.dumps(values.get("next_worker"))
+        yield b',"memory_result":' + orjson.dumps(values.get("memory_result"))
+        # History channels are trimmed to HISTORY_LIMIT entries; tell clients
+        # when what they see may not be the full session
+        truncated = any(
+            len(values.get(key) or []) >= HISTORY_LIMIT
+            for key in ("draft_history", "critiques", "scratchpad")
+        )
+        yield b',"history_truncated":' + (b'true' if truncated else b'false')
+        yield b',"messages":['
+        # Bind the per-message callables to locals: for long threads this
+        # loop dominates, and local lookups beat globals each iteration
+        dumps = orjson.dumps
+        serialize = msg_to_dict
+        for i, msg in enumerate(messages):
+            prefix = b',' if i else b''
+            yield prefix + dumps(serialize(msg))
+        yield b']}'
+
+    return StreamingResponse(generate_state(), media_type="application/json")
 
 
 @app.post("/approve")
@@ -241,11 +364,12 @@ async def approve_draft(data: ApprovalData):
         draft = current_state.values.get("current_draft")
         if draft:
             draft.content = data.edited_content
-            # Resume with updated draft
+            # Resume with updated draft (refresh the cached serialization too)
             result = await graph.ainvoke(
-                {"current_draft": draft},
+                {"current_draft": draft, "current_draft_json": draft.model_dump_json()},
                 config=config
             )
+            await _flush_checkpoints(data.thread_id)
         else:
             raise HTTPException(status_code=400, detail="No draft to edit")
     else:
@@ -261,10 +385,9 @@ async def approve_draft(data: ApprovalData):
 
 def normalize_message(message: str) -> str:
     """Normalize user message for consistent key matching"""
-    import re
     normalized = message.lower().strip()
-    normalized = re.sub(r'\s+', ' ', normalized)  # Replace multiple spaces with single space
-    normalized = re.sub(r'[^\w\s]', '', normalized)  # Remove punctuation
+    normalized = _WS_RE.sub(' ', normalized)  # Replace multiple spaces with single space
+    normalized = _PUNCT_RE.sub('', normalized)  # Remove punctuation
     return normalized[:200]
 
 @app.post("/save-draft")
@@ -286,8 +409,9 @@ async def save_draft(data: SaveDraftData):
     # This creates a new checkpoint with the edited draft
     await graph.aupdate_state(
         config,
-        {"current_draft": edited_draft}
+        {"current_draft": edited_draft, "current_draft_json": edited_draft.model_dump_json()}
     )
+    await _flush_checkpoints(data.thread_id)
     
     # Re-index draft in vector store when edited
     if data.original_message:
@@ -318,4 +442,13 @@ async def root():
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # uvloop + httptools replace the default asyncio loop and h11 parser;
+    # log_level matches the WARNING default set at the top of the module
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        log_level="warning"
+    )
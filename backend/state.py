@@ -1,21 +1,30 @@
-import operator
-from typing import Annotated, List, Optional
+from typing import Annotated, Any, List, Optional
 from typing_extensions import TypedDict
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
 from backend.models import ExerciseDraft, Critique, AgentNote, DraftVersion, ReviewMetadata
 
+# Entries kept per append-only channel. Unbounded lists made every
+# checkpoint write and /state read re-serialize the whole session (O(N^2)
+# over a long thread); agents only ever look at the most recent few.
+HISTORY_LIMIT = 10
+
+def bounded_add(old: list, new: list) -> list:
+    """Append-and-trim reducer keeping the newest HISTORY_LIMIT entries."""
+    return (old + new)[-HISTORY_LIMIT:]
+
 class AgentState(TypedDict):
     # Core messaging
     messages: Annotated[List[BaseMessage], add_messages]
-    
+
     # Enhanced draft tracking
     current_draft: Optional[ExerciseDraft]
-    draft_history: Annotated[List[DraftVersion], operator.add]
-    
+    current_draft_json: Optional[str]  # model_dump_json() of current_draft, computed once per version
+    draft_history: Annotated[List[DraftVersion], bounded_add]
+
     # Rich feedback system
-    critiques: Annotated[List[Critique], operator.add]
-    scratchpad: Annotated[List[AgentNote], operator.add]
+    critiques: Annotated[List[Critique], bounded_add]
+    scratchpad: Annotated[List[AgentNote], bounded_add]
     
     # Metadata tracking
     metadata: ReviewMetadata
@@ -26,3 +35,8 @@ class AgentState(TypedDict):
     
     # Memory and retrieval
     memory_result: Optional[dict]  # {intent, found, draft, confidence, query, original_message}
+
+    # Optional async callback receiving partial drafts as the drafter streams.
+    # Only set this with a non-persistent checkpointer (e.g. InMemorySaver):
+    # callables can't be serialized into sqlite checkpoints.
+    stream_sink: Optional[Any]
@@ -3,6 +3,8 @@ Vector storage and semantic search for draft retrieval.
 Uses OpenAI embeddings for semantic similarity search.
 """
 import json
+import re
+import dataclasses
 import aiosqlite
 import os
 from typing import List, Optional, Dict, Any
@@ -12,6 +14,10 @@ from backend.models import ExerciseDraft, ReviewMetadata
 EMBEDDING_MODEL = "text-embedding-3-small"
 SIMILARITY_THRESHOLD = 0.75  # Minimum similarity score to return a match (increased for stricter matching)
 
+# Compiled once at import; _normalize_message runs on every index write
+_WS_RE = re.compile(r'\s+')
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
 # Lazy initialization of OpenAI client
 _client = None
 
@@ -25,17 +31,30 @@ def get_openai_client():
         _client = OpenAI(api_key=api_key)
     return _client
 
+# Extending topic coverage only requires adding an entry here; the compiled
+# pattern below is derived from this set at import time.
+TOPIC_VOCAB = frozenset({
+    'anxiety', 'depression', 'stress', 'panic', 'phobia', 'ocd', 'ptsd',
+    'trauma', 'grief', 'anger', 'sleep', 'insomnia', 'eating', 'addiction',
+    'relationship', 'social', 'work', 'school', 'exam', 'presentation',
+    'public speaking', 'confidence', 'self esteem', 'loneliness', 'guilt',
+    'shame', 'worry', 'fear', 'anger management', 'mindfulness', 'relaxation',
+    'procrastination', 'burnout'
+})
+
+# Compiled once at import; longer phrases first so "anger management" wins
+# over "anger". One C-level scan replaces a Python loop of substring checks.
+# Anchored at the word start only: the trailing \w* accepts inflected forms
+# ("stressed", "worrying", "trouble sleeping") while the leading \b still
+# rejects mid-word hits like "work" inside "homework".
+TOPIC_PATTERN = re.compile(
+    r'\b(' + '|'.join(re.escape(t) for t in sorted(TOPIC_VOCAB, key=len, reverse=True)) + r')\w*',
+    re.IGNORECASE
+)
+
 def extract_topics(text: str) -> set:
     """Extract mental health topic keywords from text."""
-    topics = [
-        'anxiety', 'depression', 'stress', 'panic', 'phobia', 'ocd', 'ptsd',
-        'trauma', 'grief', 'anger', 'sleep', 'insomnia', 'eating', 'addiction',
-        'relationship', 'social', 'work', 'school', 'exam', 'presentation',
-        'public speaking', 'confidence', 'self esteem', 'loneliness', 'guilt',
-        'shame', 'worry', 'fear', 'anger management', 'mindfulness', 'relaxation'
-    ]
-    text_lower = text.lower()
-    return {topic for topic in topics if topic in text_lower}
+    return {match.lower() for match in TOPIC_PATTERN.findall(text)}
 
 
 async def initialize_vector_store(db_path: str = "backend/checkpoints.db"):
@@ -108,7 +127,9 @@ async def index_draft(
     
     # Serialize metadata
     if metadata:
-        if hasattr(metadata, "model_dump"):
+        if dataclasses.is_dataclass(metadata) and not isinstance(metadata, type):
+            metadata_json = json.dumps(dataclasses.asdict(metadata))
+        elif hasattr(metadata, "model_dump"):
             metadata_json = json.dumps(metadata.model_dump())
         elif hasattr(metadata, "__dict__"):
             metadata_json = json.dumps(metadata.__dict__)
@@ -137,27 +158,28 @@ async def index_draft(
     return normalized_msg
 
 
-async def search_drafts(
+async def search_drafts_stream(
     query: str,
-    limit: int = 5,
     threshold: float = SIMILARITY_THRESHOLD,
     db_path: str = "backend/checkpoints.db"
-) -> List[Dict[str, Any]]:
+):
     """
-    Search for drafts using semantic similarity.
-    
+    Yield matching drafts one at a time in descending similarity order.
+
+    Scoring all rows is unavoidable (ordering needs every similarity), but the
+    expensive per-candidate work - parsing draft_content and metadata JSON -
+    only happens when a candidate is actually yielded. Callers that validate
+    and break on the first acceptable match pay for one materialization
+    instead of `limit`.
+
     Args:
         query: The search query text
-        limit: Maximum number of results to return
         threshold: Minimum similarity score (0-1)
         db_path: Path to SQLite database
-    
-    Returns:
-        List of matching drafts with similarity scores, sorted by score descending
     """
     # Generate embedding for query
     query_embedding = generate_embedding(query)
-    
+
     # Fetch all drafts with embeddings
     async with aiosqlite.connect(db_path) as db:
         db.row_factory = aiosqlite.Row
@@ -167,49 +189,70 @@ async def search_drafts(
             FROM draft_embeddings
         """)
         rows = await cursor.fetchall()
-    
-    # Extract topics from query for validation
-    query_topics = extract_topics(query)
-    
-    # Calculate similarities
-    results = []
+
+    scored = []
     for row in rows:
         stored_embedding = json.loads(row["embedding"])
         similarity = cosine_similarity(query_embedding, stored_embedding)
-        
         if similarity >= threshold:
-            # Topic validation: if query has topics, ensure draft matches at least one
-            if query_topics:
-                # Use original message as primary source for topic (most reliable)
-                # Also check draft title, but original_message is the source of truth
-                draft_title = row['draft_title'] or ''
-                original_message = row['original_message'] or ''
-                
-                # Prioritize original_message for topic extraction (user's original request)
-                # This ensures we match based on what the user originally asked for, not edited content
-                draft_text_for_topics = f"{original_message} {draft_title}"
-                draft_topics = extract_topics(draft_text_for_topics)
-                
-                # Require at least one topic match - strict validation
-                if not query_topics.intersection(draft_topics):
-                    continue  # Skip this match - topics don't align
-            
-            draft_data = json.loads(row["draft_content"])
-            metadata_data = json.loads(row["metadata"]) if row["metadata"] else {}
-            
-            results.append({
-                "draft_id": row["draft_id"],
-                "normalized_message": row["normalized_message"],
-                "draft": draft_data,
-                "original_message": row["original_message"],
-                "metadata": metadata_data,
-                "similarity": similarity,
-                "title": row["draft_title"]
-            })
-    
-    # Sort by similarity descending and return top results
-    results.sort(key=lambda x: x["similarity"], reverse=True)
-    return results[:limit]
+            scored.append((similarity, row))
+
+    scored.sort(key=lambda item: item[0], reverse=True)
+
+    for similarity, row in scored:
+        yield {
+            "draft_id": row["draft_id"],
+            "normalized_message": row["normalized_message"],
+            "draft": json.loads(row["draft_content"]),
+            "original_message": row["original_message"],
+            "metadata": json.loads(row["metadata"]) if row["metadata"] else {},
+            "similarity": similarity,
+            "title": row["draft_title"]
+        }
+
+
+async def search_drafts(
+    query: str,
+    limit: int = 5,
+    threshold: float = SIMILARITY_THRESHOLD,
+    db_path: str = "backend/checkpoints.db"
+) -> List[Dict[str, Any]]:
+    """
+    Search for drafts using semantic similarity.
+
+    Args:
+        query: The search query text
+        limit: Maximum number of results to return
+        threshold: Minimum similarity score (0-1)
+        db_path: Path to SQLite database
+
+    Returns:
+        List of matching drafts with similarity scores, sorted by score descending
+    """
+    # Extract topics from query for validation
+    query_topics = extract_topics(query)
+
+    # Bind the compiled scan once so the candidate loop is a tight
+    # C-level findall per row instead of a Python call chain
+    findall = TOPIC_PATTERN.findall
+
+    results = []
+    async for match in search_drafts_stream(query, threshold=threshold, db_path=db_path):
+        # Topic validation: if query has topics, ensure draft matches at least one.
+        # Prioritize original_message for topic extraction (user's original request)
+        # so we match based on what the user asked for, not edited content.
+        if query_topics:
+            draft_topics = {m.lower() for m in findall(f"{match['original_message'] or ''} {match['title'] or ''}")}
+
+            # Require at least one topic match - strict validation
+            if not query_topics.intersection(draft_topics):
+                continue  # Skip this match - topics don't align
+
+        results.append(match)
+        if len(results) >= limit:
+            break
+
+    return results
 
 
 async def delete_draft(
@@ -227,8 +270,7 @@ async def delete_draft(
 
 def _normalize_message(message: str) -> str:
     """Normalize user message for consistent key matching."""
-    import re
     normalized = message.lower().strip()
-    normalized = re.sub(r'\s+', ' ', normalized)  # Replace multiple spaces with single space
-    normalized = re.sub(r'[^\w\s]', '', normalized)  # Remove punctuation
+    normalized = _WS_RE.sub(' ', normalized)  # Replace multiple spaces with single space
+    normalized = _PUNCT_RE.sub('', normalized)  # Remove punctuation
     return normalized[:200]
@@ -55,10 +55,11 @@ interface ConversationItem {
 }
 
 const AGENT_INFO: Record<string, { displayName: string }> = {
-  intent_router: { displayName: 'Intent Router' },
+  memory_agent: { displayName: 'Memory Agent' },
   chat: { displayName: 'Chat Agent' },
   supervisor: { displayName: 'Supervisor' },
   drafter: { displayName: 'Drafter' },
+  review: { displayName: 'Review' },
   safety_guardian: { displayName: 'Safety Guardian' },
   clinical_critic: { displayName: 'Clinical Critic' },
 };
@@ -206,8 +207,9 @@ function App() {
       thoughts.push(`Routing to ${nextName}`);
     }
 
-    // Extract intent routing (skip for chat route)
-    if (nodeData.next_worker && nodeName === 'intent_router') {
+    // Extract intent routing from the memory agent, which carries the fused
+    // classification (skip for chat route)
+    if (nodeData.next_worker && nodeName === 'memory_agent') {
       if (nodeData.next_worker !== 'chat') {
         thoughts.push(`Intent: CBT exercise creation`);
       }
@@ -222,12 +224,15 @@ function App() {
       thoughts.push(`Draft created: "${draft.title || 'New draft'}" (v${versionNum})`);
     }
 
-    // Extract critiques with full content for review agents (safety_guardian, clinical_critic)
+    // Extract critiques with full content from the fused review node (both
+    // reviewers report in one event; legacy node names kept for old threads)
     if (nodeData.critiques && Array.isArray(nodeData.critiques)) {
-      const recentCritiques = nodeData.critiques.slice(-1);
+      const recentCritiques = nodeName === 'review'
+        ? nodeData.critiques.slice(-2)
+        : nodeData.critiques.slice(-1);
       recentCritiques.forEach((critique: any) => {
         if (critique.content && critique.author) {
-          if (nodeName === 'safety_guardian' || nodeName === 'clinical_critic') {
+          if (nodeName === 'review' || nodeName === 'safety_guardian' || nodeName === 'clinical_critic') {
             const status = critique.approved ? 'Approved' : 'Rejected';
             // Include full critique content
             thoughts.push(`${critique.author}: ${status}\n${critique.content}`);
@@ -285,21 +290,26 @@ function App() {
 
       let assistantMessageAdded = false;
       let isChatRoute = false;
+      // SSE frames are batched server-side and can be split across reads, so
+      // keep any trailing partial line in a buffer until the next chunk.
+      let buffer = '';
 
       while (true) {
         const { done, value } = await reader.read();
         if (done) break;
 
-        const chunk = decoder.decode(value);
-        const lines = chunk.split('\n');
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop() ?? '';
 
         for (const line of lines) {
           if (line.startsWith('data: ')) {
             try {
               const data = JSON.parse(line.slice(6));
 
-              // Detect if this is a chat route
-              if (data.intent_router && data.intent_router.next_worker === 'chat') {
+              // Detect if this is a chat route (classification is fused
+              // into the memory agent)
+              if (data.memory_agent && data.memory_agent.next_worker === 'chat') {
                 isChatRoute = true;
               }
 
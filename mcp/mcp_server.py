@@ -3,6 +3,7 @@ MCP Server for Clarity CBT
 Exposes the multi-agent CBT workflow as an MCP tool for Claude Desktop
 """
 import asyncio
+import hashlib
 import os
 from typing import Any
 from mcp.server.models import InitializationOptions
@@ -11,16 +12,40 @@ from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent, ImageContent, EmbeddedResource
 from dotenv import load_dotenv
 from backend.graph import get_graph
-from backend.models import ReviewMetadata
+from backend.models import ExerciseDraft, ReviewMetadata
 from backend.formatter import format_exercise_for_presentation
+from backend.vector_store import search_drafts
 from langgraph.checkpoint.memory import InMemorySaver
 from langchain_core.messages import HumanMessage
 
-load_dotenv()
+# .env parsing is a dev convenience; production deployments inject real
+# env vars, so skip the stat/parse of the file there
+if os.getenv("ENV") != "production":
+    load_dotenv()
+
+# Read once at import - the key never changes mid-process and a module
+# constant beats an os.environ lookup per tool call
+_OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 # Initialize MCP server
 server = Server("clarity-cbt")
 
+# Compile the graph once and share one checkpointer across calls: graph
+# construction and compilation (node registration, edge wiring, schema
+# validation) are non-trivial, and a shared saver lets repeat requests with
+# the same thread id reuse their checkpoints. Compiled lazily on first call
+# so importing this module stays cheap.
+_CHECKPOINTER = InMemorySaver()
+_APP = None
+
+
+def _get_app():
+    """Return the compiled workflow, building it on first use."""
+    global _APP
+    if _APP is None:
+        _APP = get_graph().compile(checkpointer=_CHECKPOINTER)
+    return _APP
+
 @server.list_tools()
 async def handle_list_tools() -> list[Tool]:
     """
@@ -55,6 +80,11 @@ Examples:
                     "request": {
                         "type": "string",
                         "description": "Description of the mental health challenge or CBT need (e.g., 'social anxiety', 'insomnia', 'work stress', 'perfectionism')"
+                    },
+                    "force_refresh": {
+                        "type": "boolean",
+                        "description": "Skip the cached-exercise lookup and always run the full multi-agent workflow",
+                        "default": False
                     }
                 },
                 "required": ["request"]
@@ -72,7 +102,7 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
     if name != "create_cbt_exercise":
         raise ValueError(f"Unknown tool: {name}")
     
-    if not os.getenv("OPENAI_API_KEY"):
+    if not _OPENAI_API_KEY:
         return [TextContent(
             type="text",
             text="❌ Error: OPENAI_API_KEY not configured. Please set it in your .env file."
@@ -85,14 +115,48 @@ async def handle_call_tool(name: str, arguments: dict) -> list[TextContent | Ima
             text="❌ Error: Please provide a request describing your CBT needs."
         )]
     
+    force_refresh = bool(arguments.get("force_refresh", False))
+
     try:
-        # Initialize the graph with checkpointer
-        graph = get_graph()
-        checkpointer = InMemorySaver()
-        app = graph.compile(checkpointer=checkpointer)
-        
-        # Create thread for this request
-        thread_id = f"mcp-{hash(request)}"
+        # Near-duplicate requests (e.g. "CBT for social anxiety" vs "cbt
+        # exercise social anxiety") can reuse an already-reviewed draft from
+        # the vector store instead of re-running the whole agent workflow:
+        # <50ms and zero LLM tokens on a hit vs tens of seconds for a run.
+        if not force_refresh:
+            try:
+                matches = await search_drafts(request, limit=1, threshold=0.9)
+            except Exception:
+                # Cache lookup is best-effort; fall through to the workflow
+                matches = []
+            if matches:
+                match = matches[0]
+                draft = ExerciseDraft(**match["draft"])
+                metadata = ReviewMetadata(**match["metadata"]) if match.get("metadata") else None
+                formatted_exercise = format_exercise_for_presentation(draft, metadata)
+                summary = f"""
+🧠 **Clarity CBT**
+Multi-Agent CBT Exercise Generation System
+
+**Your Request:** {request}
+
+**Retrieved from your exercise library** (similarity {match['similarity']:.2f}; pass force_refresh to regenerate)
+
+---
+
+{formatted_exercise}
+
+---
+
+💡 **Note**: This exercise was created by our multi-agent system with Safety Guardian and Clinical Critic reviews. For personalized care, consult a mental health professional.
+"""
+                return [TextContent(type="text", text=summary)]
+
+        app = _get_app()
+
+        # Create thread for this request. BLAKE2b is stable across processes
+        # (builtin hash is randomized by PYTHONHASHSEED), so repeat requests
+        # map to the same thread and can reuse checkpoints.
+        thread_id = "mcp-" + hashlib.blake2b(request.encode("utf-8"), digest_size=8).hexdigest()
         config = {"configurable": {"thread_id": thread_id}}
         
         # Initialize state